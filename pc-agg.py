@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os, sys, csv, json, math, argparse
+from glob import iglob
+
+INPUT_ROOT = "matrikkelen"
+OUTPUT_ROOT = "aggregat"
+STORE_FILE = os.path.join(OUTPUT_ROOT, "rollups.json")
+INNTAK_FILE = os.path.join(OUTPUT_ROOT, "inntak.json")
+TABLE_FILE = os.path.join(OUTPUT_ROOT, "rollups.csv")
+
+NIVÅER = ("kommune", "postnummer")
+DIMENSJONER = ("propertyType", "buildingType", "saleType")
+
+# Kvantilskisse med logaritmiske bøtter (relativ feil <= 1 %).
+# Bøttene er rene tellere, så to skisser slås sammen ved å summere dem.
+SKISSE_ALFA = 0.01
+SKISSE_GAMMA = (1 + SKISSE_ALFA) / (1 - SKISSE_ALFA)
+SKISSE_LOG_GAMMA = math.log(SKISSE_GAMMA)
+
+TABELL_KOLONNER = [
+    "nivå", "kode", "fylke", "måned", *DIMENSJONER,
+    "antall", "omsetning", "kvm_antall",
+    "snitt_kvm_pris", "median_kvm_pris", "p25_kvm_pris", "p75_kvm_pris",
+]
+
+
+# -----------------------------
+# Hjelpefunksjoner
+# -----------------------------
+def safe_load(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Feil ved lesing av {path}: {e}")
+        return []
+
+
+def parse_intervall_eller_liste(verdi):
+    if not verdi:
+        return []
+    if ":" in verdi:
+        start, slutt = verdi.split(":")
+        return [str(i) for i in range(int(start), int(slutt) + 1)]
+    return verdi.split()
+
+
+def tall(verdi):
+    try:
+        return float(verdi)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+# -----------------------------
+# Kvantilskisse
+# -----------------------------
+def skisse_legg_til(skisse, verdi):
+    i = str(math.ceil(math.log(verdi) / SKISSE_LOG_GAMMA))
+    skisse[i] = skisse.get(i, 0) + 1
+
+
+def skisse_slå_sammen(mål, kilde):
+    for i, n in kilde.items():
+        mål[i] = mål.get(i, 0) + n
+
+
+def skisse_kvantil(skisse, q):
+    total = sum(skisse.values())
+    if not total:
+        return None
+    rang = q * (total - 1)
+    akkumulert = 0
+    for i in sorted(skisse, key=int):
+        akkumulert += skisse[i]
+        if akkumulert > rang:
+            return 2 * SKISSE_GAMMA ** int(i) / (SKISSE_GAMMA + 1)
+    return None
+
+
+# -----------------------------
+# Materialisert lager
+# -----------------------------
+# rollups.json holder bare gruppene og er det --vis leser. Innlesingsstaten
+# (nøkler og delsummer per fil) ligger i inntak.json, som vokser med antall
+# transaksjoner og bare brukes ved oppdatering.
+def tomt_lager():
+    return {"grupper": {}}
+
+
+def tomt_inntak():
+    return {"filer": {}}
+
+
+def les_json(path, standard):
+    if not os.path.exists(path):
+        return standard()
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def skriv_json(path, data):
+    os.makedirs(OUTPUT_ROOT, exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def ny_gruppe():
+    return {"antall": 0, "omsetning": 0.0, "kvm_antall": 0, "kvm_sum": 0.0, "kvm_skisse": {}}
+
+
+def slå_sammen_gruppe(mål, kilde):
+    mål["antall"] += kilde["antall"]
+    mål["omsetning"] += kilde["omsetning"]
+    mål["kvm_antall"] += kilde["kvm_antall"]
+    mål["kvm_sum"] += kilde["kvm_sum"]
+    skisse_slå_sammen(mål["kvm_skisse"], kilde["kvm_skisse"])
+
+
+def trekk_fra_gruppe(mål, kilde):
+    mål["antall"] -= kilde["antall"]
+    mål["omsetning"] -= kilde["omsetning"]
+    mål["kvm_antall"] -= kilde["kvm_antall"]
+    mål["kvm_sum"] -= kilde["kvm_sum"]
+    skisse = mål["kvm_skisse"]
+    for i, n in kilde["kvm_skisse"].items():
+        skisse[i] = skisse.get(i, 0) - n
+        if skisse[i] <= 0:
+            del skisse[i]
+
+
+# -----------------------------
+# Innlesing
+# -----------------------------
+def transaksjonsnøkkel(t, f, i):
+    """
+    documentNumber starter på nytt hvert år, så året tas med i nøkkelen.
+    Transaksjoner uten documentNumber kan ikke dedupliseres og får en
+    nøkkel som er unik for posisjonen i filen.
+    """
+    dok = t.get("documentNumber")
+    if dok is None or dok == "":
+        return f"{f}#{i}"
+    return f"{(t.get('date') or '')[:4]}-{dok}"
+
+
+def les_fil(f):
+    ut = []
+    for i, t in enumerate(safe_load(f)):
+        if not isinstance(t, dict):
+            continue
+        if len((t.get("date") or "")[:7]) != 7:
+            continue
+        ut.append((transaksjonsnøkkel(t, f, i), t))
+    return ut
+
+
+def delsummer(transaksjoner, eide):
+    """
+    Grupperer transaksjonene filen eier. Hver nøkkel telles bare én gang.
+    """
+    grupper = {}
+    sett = set()
+    for key, t in transaksjoner:
+        if key not in eide or key in sett:
+            continue
+        sett.add(key)
+
+        måned = t["date"][:7]
+        pris = tall(t.get("price"))
+        kvm_pris = tall(t.get("pricePerSquareMeter"))
+        fylke = str(t.get("countyCode") or "")
+        dims = [str(t.get(d) or "") for d in DIMENSJONER]
+        raw_pc = str(t.get("postalCode") or "").strip()
+        koder = (
+            ("kommune", str(t.get("municipalityCode") or "")),
+            ("postnummer", raw_pc.zfill(4) if raw_pc.isdigit() else ""),
+        )
+
+        for nivå, kode in koder:
+            if not kode:
+                continue
+            g = grupper.setdefault("|".join([nivå, kode, fylke, måned, *dims]), ny_gruppe())
+            g["antall"] += 1
+            g["omsetning"] += pris
+            if kvm_pris > 0:
+                g["kvm_antall"] += 1
+                g["kvm_sum"] += kvm_pris
+                skisse_legg_til(g["kvm_skisse"], kvm_pris)
+    return grupper
+
+
+def oppdater(lager, inntak):
+    """
+    Oppdaterer gruppene etter endringer under matrikkelen/.
+
+    Hver transaksjon eies av den første filen (i sortert rekkefølge) som
+    inneholder den, slik at fylkes- og kommunefiler med samme salg ikke
+    telles dobbelt. Delsummene per fil lagres i inntaket. Når en fil er ny,
+    endret eller slettet, eller eierskapet til nøklene dens har flyttet seg,
+    trekkes de gamle delsummene fra og de nye legges til.
+    """
+    grupper = lager["grupper"]
+    filer = inntak["filer"]
+
+    nå = {f: os.path.getmtime(f) for f in sorted(iglob(os.path.join(INPUT_ROOT, "**", "*-*.json"), recursive=True))}
+    slettet = [f for f in filer if f not in nå]
+
+    lest = {}
+    for f, mtime in nå.items():
+        if f not in filer or filer[f]["mtime"] != mtime:
+            print(f"Leser {f}")
+            lest[f] = les_fil(f)
+
+    eier = {}
+    for f in nå:
+        nøkler = [k for k, _ in lest[f]] if f in lest else filer[f]["nøkler"]
+        for k in nøkler:
+            eier.setdefault(k, f)
+    eide = {f: set() for f in nå}
+    for k, f in eier.items():
+        eide[f].add(k)
+
+    beregn = [f for f in nå if f in lest or eide[f] != set(filer[f]["eide"])]
+
+    for f in slettet + beregn:
+        if f in filer:
+            for nøkkel, g in filer[f]["grupper"].items():
+                if nøkkel in grupper:
+                    trekk_fra_gruppe(grupper[nøkkel], g)
+
+    for f in beregn:
+        transaksjoner = lest[f] if f in lest else les_fil(f)
+        delsum = delsummer(transaksjoner, eide[f])
+        for nøkkel, g in delsum.items():
+            slå_sammen_gruppe(grupper.setdefault(nøkkel, ny_gruppe()), g)
+        filer[f] = {
+            "mtime": nå[f],
+            "nøkler": sorted({k for k, _ in transaksjoner}),
+            "eide": sorted(eide[f]),
+            "grupper": delsum,
+        }
+
+    for f in slettet:
+        del filer[f]
+
+    for nøkkel in [n for n, g in grupper.items() if g["antall"] <= 0]:
+        del grupper[nøkkel]
+
+    return len(beregn), len(slettet)
+
+
+# -----------------------------
+# Tabell og spørring
+# -----------------------------
+def tabellrad(felter, g):
+    def rund(v):
+        return None if v is None else round(v)
+
+    snitt = g["kvm_sum"] / g["kvm_antall"] if g["kvm_antall"] else None
+    return [
+        *felter,
+        g["antall"],
+        rund(g["omsetning"]),
+        g["kvm_antall"],
+        rund(snitt),
+        rund(skisse_kvantil(g["kvm_skisse"], 0.5)),
+        rund(skisse_kvantil(g["kvm_skisse"], 0.25)),
+        rund(skisse_kvantil(g["kvm_skisse"], 0.75)),
+    ]
+
+
+def skriv_tabell(lager):
+    with open(TABLE_FILE, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(TABELL_KOLONNER)
+        for nøkkel in sorted(lager["grupper"]):
+            w.writerow(tabellrad(nøkkel.split("|"), lager["grupper"][nøkkel]))
+
+
+def spør(lager, nivå, fylker, koder, år, måneder, behold):
+    """
+    Filtrerer gruppene og slår sammen dimensjoner som ikke er i `behold`.
+    """
+    måneder = {m.zfill(2) for m in måneder}
+    resultat = {}
+    for nøkkel, g in lager["grupper"].items():
+        n, kode, fylke, måned, *dims = nøkkel.split("|")
+        if n != nivå:
+            continue
+        if fylker and fylke not in fylker:
+            continue
+        if koder and kode not in koder:
+            continue
+        if år and måned[:4] not in år:
+            continue
+        if måneder and måned[5:] not in måneder:
+            continue
+        felter = (n, kode, fylke, måned, *[v if d in behold else "*" for d, v in zip(DIMENSJONER, dims)])
+        slå_sammen_gruppe(resultat.setdefault(felter, ny_gruppe()), g)
+    return resultat
+
+
+# -----------------------------
+# Hovedfunksjon
+# -----------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Aggregerer pris per m², antall og omsetning per kommune/postnummer/måned.")
+    parser.add_argument("--full", action="store_true", help="Bygg lageret på nytt fra alle filer")
+    parser.add_argument("--vis", action="store_true", help="Spør mot lageret uten å lese matrikkelen/ på nytt")
+    parser.add_argument("--nivå", choices=NIVÅER, default="kommune", help="Aggregeringsnivå for --vis")
+    parser.add_argument("--fylke", type=str, nargs="*", help="Fylkesnummer (liste eller intervall)")
+    parser.add_argument("--kommune", type=str, nargs="*", help="Kommunenummer (liste eller intervall)")
+    parser.add_argument("--postnummer", type=str, nargs="*", help="Postnummer (liste eller intervall)")
+    parser.add_argument("--år", type=str, nargs="*", help="År (liste eller intervall f.eks. 2022:2025)")
+    parser.add_argument("--måned", type=str, nargs="*", help="Måned (liste eller intervall 1:12)")
+    parser.add_argument("--grupper", choices=DIMENSJONER, nargs="*", default=list(DIMENSJONER),
+                        help="Dimensjoner som beholdes i --vis (resten slås sammen)")
+    args = parser.parse_args()
+
+    if args.nivå == "kommune" and args.postnummer:
+        parser.error("--postnummer krever --nivå postnummer")
+    if args.nivå == "postnummer" and args.kommune:
+        parser.error("--kommune kan ikke brukes med --nivå postnummer")
+
+    if not args.vis:
+        # Lager og inntak må høre sammen; mangler ett av dem bygges alt på nytt
+        if args.full or not (os.path.exists(STORE_FILE) and os.path.exists(INNTAK_FILE)):
+            lager, inntak = tomt_lager(), tomt_inntak()
+        else:
+            lager, inntak = les_json(STORE_FILE, tomt_lager), les_json(INNTAK_FILE, tomt_inntak)
+        beregnet, slettet = oppdater(lager, inntak)
+        skriv_json(INNTAK_FILE, inntak)
+        skriv_json(STORE_FILE, lager)
+        skriv_tabell(lager)
+        print(f"Beregnet {beregnet} filer, fjernet {slettet}, {len(lager['grupper'])} grupper i {TABLE_FILE}")
+        return
+
+    fylker, kommuner, postnumre, år, måneder = [], [], [], [], []
+    for f in (args.fylke or []):
+        fylker.extend(x.zfill(2) for x in parse_intervall_eller_liste(f))
+    for k in (args.kommune or []):
+        kommuner.extend(x.zfill(4) for x in parse_intervall_eller_liste(k))
+    for p in (args.postnummer or []):
+        postnumre.extend(x.zfill(4) for x in parse_intervall_eller_liste(p))
+    for y in (args.år or []):
+        år.extend(parse_intervall_eller_liste(y))
+    for m in (args.måned or []):
+        måneder.extend(parse_intervall_eller_liste(m))
+
+    if not os.path.exists(STORE_FILE):
+        print(f"Fant ikke {STORE_FILE}, kjør pc-agg.py uten --vis først")
+        sys.exit(1)
+
+    koder = kommuner if args.nivå == "kommune" else postnumre
+    resultat = spør(les_json(STORE_FILE, tomt_lager), args.nivå, fylker, koder, år, måneder, args.grupper)
+
+    w = csv.writer(sys.stdout)
+    w.writerow(TABELL_KOLONNER)
+    for felter in sorted(resultat):
+        w.writerow(tabellrad(felter, resultat[felter]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import contextlib
+import csv
+import importlib.util
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from glob import iglob
+from unittest import mock
+
+SMAL = ("date", "price", "postalCode")
+
+
+def last_etl():
+    sti = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pc-etl.py")
+    spec = importlib.util.spec_from_file_location("pc_etl", sti)
+    modul = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modul)
+    return modul
+
+
+def lag_syntetisk_måned(rot, antall):
+    """
+    Skriver én måned med transaksjoner på samme form som pc-get.py lagrer.
+    """
+    random.seed(1)
+    mappe = os.path.join(rot, "matrikkelen", "50-Trøndelag", "5001-Trondheim")
+    os.makedirs(mappe, exist_ok=True)
+    data = []
+    for i in range(antall):
+        areal = random.randint(30, 250)
+        pris = random.randint(10, 150) * 100000
+        data.append({
+            "id": i,
+            "municipality": "Trondheim",
+            "sellerList": "[\"Ola Nordmann\"]",
+            "buyerList": "[\"Kari Nordmann\"]",
+            "cadestralId": f"5001-{random.randint(1, 500)}-{random.randint(1, 2000)}-0-0",
+            "housingCoopNumber": "",
+            "housingCoopName": "",
+            "housingCoopUnitCode": "H0101",
+            "housingCoopId": "",
+            "saleType": random.choice(["Fritt salg", "Skifteoppgjør", "Tvangssalg"]),
+            "saleId": f"2023-{i}-1",
+            "price": pris,
+            "pricePerSquareMeter": pris // areal,
+            "livingArea": areal,
+            "floor": random.randint(0, 6),
+            "propertyArea": random.randint(100, 2000),
+            "date": f"2023-01-{random.randint(1, 31):02d}T20:00:00",
+            "documentNumber": i,
+            "municipalityCode": "5001",
+            "postalCode": str(random.randint(7010, 7099)),
+            "postalArea": "Trondheim",
+            "streetName": "Prinsens gate",
+            "houseNumber": str(random.randint(1, 200)),
+            "houseLetter": "",
+            "countyCode": "50",
+            "latitude": 63.43 + random.random() / 10,
+            "longitude": 10.39 + random.random() / 10,
+            "propertyType": "Bolig",
+            "buildingType": random.choice(["Frittliggende enebolig", "Rekkehus", "Leilighet"]),
+        })
+    with open(os.path.join(mappe, "50-5001-2023-01.json"), "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+
+
+def collect_dict(fylker, kommuner, postnumre, år, måneder):
+    """
+    Referanse: collect() slik den var før --kolonner, med én dict per rad og
+    alle 33 kolonner. Brukes som "før"-måling.
+    """
+    def safe_load(path):
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Feil ved lesing av {path}: {e}")
+            return []
+
+    def parse_cadestral_id(cid):
+        parts = (cid or "").split("-")
+        parts += ["0"] * (5 - len(parts))
+        return parts[0], parts[1], parts[2], parts[3], parts[4]
+
+    seen = set()
+    for f in iglob(os.path.join("matrikkelen", "**", "*-*.json"), recursive=True):
+        print(f"Sjekker {f}")
+        for t in safe_load(f):
+            if not isinstance(t, dict):
+                continue
+
+            raw_pc = str(t.get("postalCode") or "").strip()
+            if postnumre and (not raw_pc.isdigit() or raw_pc == ""):
+                continue
+            pc = raw_pc.zfill(4)
+
+            if postnumre and pc not in postnumre:
+                continue
+            else:
+                print(f"Inkluderer {f} (postnummer={pc})")
+
+            key = t.get("documentNumber")
+            if key in seen:
+                continue
+            seen.add(key)
+
+            k, g, b, fn, s = parse_cadestral_id(t.get("cadestralId"))
+            yield {
+                "date": t.get("date"),
+                "år": (t.get("date") or "")[:4],
+                "municipalityCode": t.get("municipalityCode"),
+                "municipality": t.get("municipality"),
+                "postalCode": pc,
+                "postalArea": t.get("postalArea"),
+                "streetName": t.get("streetName"),
+                "houseNumber": t.get("houseNumber"),
+                "houseLetter": t.get("houseLetter"),
+                "buildingType": t.get("buildingType"),
+                "propertyType": t.get("propertyType"),
+                "saleType": t.get("saleType"),
+                "price": t.get("price"),
+                "propertyArea_m2": t.get("propertyArea"),
+                "livingArea_m2": t.get("livingArea"),
+                "pricePerSquareMeter": t.get("pricePerSquareMeter"),
+                "latitude": t.get("latitude"),
+                "longitude": t.get("longitude"),
+                "countyCode": t.get("countyCode"),
+                "gnr": g,
+                "bnr": b,
+                "fnr": fn,
+                "snr": s,
+                "documentNumber": key,
+                "saleId": t.get("saleId"),
+                "source": f,
+                "sellerList": t.get("sellerList"),
+                "buyerList": t.get("buyerList"),
+                "housingCoopNumber": t.get("housingCoopNumber"),
+                "housingCoopName": t.get("housingCoopName"),
+                "housingCoopUnitCode": t.get("housingCoopUnitCode"),
+                "housingCoopId": t.get("housingCoopId"),
+                "floor": t.get("floor"),
+            }
+
+
+def mål(lag_rader, kolonner, tekst, som_dict):
+    """
+    Returnerer (rader, rader/s inkl. CSV-skriving, allokert byte/rad,
+    beholdt byte/rad). JSON-en parses på forhånd og serveres via json.load,
+    slik at parsing ikke telles med i tid eller minne.
+
+    Allokert er toppen i tracemalloc over grunnlinjen mens alle rader bygges,
+    og tar med midlertidige objekter. Beholdt er det som fortsatt lever
+    etterpå. Begge deles på antall rader.
+    """
+    with open(os.devnull, "w") as null, contextlib.redirect_stdout(null):
+        data = json.loads(tekst)
+        with mock.patch.object(json, "load", lambda f: data):
+            w = csv.DictWriter(null, fieldnames=kolonner) if som_dict else csv.writer(null)
+            antall = 0
+            start = time.perf_counter()
+            for rad in lag_rader():
+                w.writerow(rad)
+                antall += 1
+            varighet = time.perf_counter() - start
+
+        data = json.loads(tekst)
+        with mock.patch.object(json, "load", lambda f: data):
+            tracemalloc.start()
+            før = tracemalloc.get_traced_memory()[0]
+            rader = list(lag_rader())
+            etter, topp = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+    return antall, antall / varighet, (topp - før) / len(rader), (etter - før) / len(rader)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Måler rader/s og minne per rad i pc-etl.py sin collect()")
+    parser.add_argument("--rader", type=int, default=200000, help="Antall syntetiske transaksjoner")
+    args = parser.parse_args()
+
+    etl = last_etl()
+    opprinnelig = os.getcwd()
+    with tempfile.TemporaryDirectory() as rot:
+        print(f"Lager syntetisk måned med {args.rader} transaksjoner")
+        lag_syntetisk_måned(rot, args.rader)
+        os.chdir(rot)
+        try:
+            sti = next(iglob(os.path.join("matrikkelen", "**", "*-*.json"), recursive=True))
+            with open(sti, encoding="utf-8") as f:
+                tekst = f.read()
+
+            tilfeller = [
+                ("før: dict, alle kolonner", lambda: collect_dict([], [], [], [], []), etl.KOLONNER, True),
+                ("tuple, alle kolonner", lambda: etl.collect([], [], [], [], [], etl.KOLONNER), etl.KOLONNER, False),
+                (f"tuple, {','.join(SMAL)}", lambda: etl.collect([], [], [], [], [], SMAL), SMAL, False),
+            ]
+            print(f"{'projeksjon':<34} {'rader':>8} {'rader/s':>10} {'allokert/rad':>13} {'beholdt/rad':>12}")
+            for navn, lag_rader, kolonner, som_dict in tilfeller:
+                antall, hastighet, allokert, beholdt = mål(lag_rader, kolonner, tekst, som_dict)
+                print(f"{navn:<34} {antall:>8} {hastighet:>10.0f} {allokert:>13.0f} {beholdt:>12.0f}")
+        finally:
+            os.chdir(opprinnelig)
+
+
+if __name__ == "__main__":
+    main()
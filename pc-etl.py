@@ -37,7 +37,28 @@ def parse_intervall_eller_liste(verdi):
     return verdi.split()
 
 
-def collect(fylker, kommuner, postnumre, år, måneder):
+# Utdata-skjema i fast rekkefølge. Rader fra collect() er tupler i denne
+# rekkefølgen (eller i rekkefølgen til --kolonner).
+KOLONNER = (
+    "date", "år", "municipalityCode", "municipality", "postalCode", "postalArea",
+    "streetName", "houseNumber", "houseLetter", "buildingType", "propertyType",
+    "saleType", "price", "propertyArea_m2", "livingArea_m2", "pricePerSquareMeter",
+    "latitude", "longitude", "countyCode", "gnr", "bnr", "fnr", "snr",
+    "documentNumber", "saleId", "source", "sellerList", "buyerList",
+    "housingCoopNumber", "housingCoopName", "housingCoopUnitCode", "housingCoopId",
+    "floor",
+)
+
+# Kolonner som heter noe annet i JSON-dataene
+KILDEFELT = {
+    "propertyArea_m2": "propertyArea",
+    "livingArea_m2": "livingArea",
+}
+
+MATRIKKEL_KOLONNER = ("gnr", "bnr", "fnr", "snr")
+
+
+def collect(fylker, kommuner, postnumre, år, måneder, kolonner=KOLONNER):
     from glob import iglob
     import json
 
@@ -54,6 +75,15 @@ def collect(fylker, kommuner, postnumre, år, måneder):
         parts += ["0"] * (5 - len(parts))
         return parts[0], parts[1], parts[2], parts[3], parts[4]
 
+    # Avledede felt regnes bare ut når kolonnen er med i projeksjonen. De
+    # legges inn i t under kolonnenavnet, slik at hele raden kan hentes med
+    # ett map(t.get, kilder).
+    kilder = [KILDEFELT.get(k, k) for k in kolonner]
+    trenger_år = "år" in kolonner
+    trenger_pc = bool(postnumre) or "postalCode" in kolonner
+    trenger_cid = any(k in kolonner for k in MATRIKKEL_KOLONNER)
+    trenger_kilde = "source" in kolonner
+
     seen = set()
     for f in iglob(os.path.join("matrikkelen", "**", "*-*.json"), recursive=True):
         print(f"Sjekker {f}")
@@ -61,57 +91,28 @@ def collect(fylker, kommuner, postnumre, år, måneder):
             if not isinstance(t, dict):
                 continue
 
-            raw_pc = str(t.get("postalCode") or "").strip()
-            if postnumre and (not raw_pc.isdigit() or raw_pc == ""):
-                continue
-            pc = raw_pc.zfill(4)
+            if trenger_pc:
+                raw_pc = str(t.get("postalCode") or "").strip()
+                if postnumre and (not raw_pc.isdigit() or raw_pc == ""):
+                    continue
+                pc = raw_pc.zfill(4)
 
-            if postnumre and pc not in postnumre:
-                continue
-            else:
-                print(f"Inkluderer {f} (postnummer={pc})")
+                if postnumre and pc not in postnumre:
+                    continue
+                t["postalCode"] = pc
 
             key = t.get("documentNumber")
             if key in seen:
                 continue
             seen.add(key)
 
-            k, g, b, fn, s = parse_cadestral_id(t.get("cadestralId"))
-            yield {
-                "date": t.get("date"),
-                "år": (t.get("date") or "")[:4],
-                "municipalityCode": t.get("municipalityCode"),
-                "municipality": t.get("municipality"),
-                "postalCode": pc,
-                "postalArea": t.get("postalArea"),
-                "streetName": t.get("streetName"),
-                "houseNumber": t.get("houseNumber"),
-                "houseLetter": t.get("houseLetter"),
-                "buildingType": t.get("buildingType"),
-                "propertyType": t.get("propertyType"),
-                "saleType": t.get("saleType"),
-                "price": t.get("price"),
-                "propertyArea_m2": t.get("propertyArea"),
-                "livingArea_m2": t.get("livingArea"),
-                "pricePerSquareMeter": t.get("pricePerSquareMeter"),
-                "latitude": t.get("latitude"),
-                "longitude": t.get("longitude"),
-                "countyCode": t.get("countyCode"),
-                "gnr": g,
-                "bnr": b,
-                "fnr": fn,
-                "snr": s,
-                "documentNumber": key,
-                "saleId": t.get("saleId"),
-                "source": f,
-                "sellerList": t.get("sellerList"),
-                "buyerList": t.get("buyerList"),
-                "housingCoopNumber": t.get("housingCoopNumber"),
-                "housingCoopName": t.get("housingCoopName"),
-                "housingCoopUnitCode": t.get("housingCoopUnitCode"),
-                "housingCoopId": t.get("housingCoopId"),
-                "floor": t.get("floor"),
-            }
+            if trenger_år:
+                t["år"] = (t.get("date") or "")[:4]
+            if trenger_cid:
+                _, t["gnr"], t["bnr"], t["fnr"], t["snr"] = parse_cadestral_id(t.get("cadestralId"))
+            if trenger_kilde:
+                t["source"] = f
+            yield tuple(map(t.get, kilder))
 
   # {
   #   "id": 687239,
@@ -195,6 +196,8 @@ def main():
     parser.add_argument("--postnummer", type=str, nargs="*", help="Postnummer (liste eller intervall)")
     parser.add_argument("--år", type=str, nargs="*", help="År (liste eller intervall f.eks. 2022:2025)")
     parser.add_argument("--måned", type=str, nargs="*", help="Måned (liste eller intervall 1:12)")
+    parser.add_argument("--kolonner", "--columns", type=str, nargs="*",
+                        help=f"Kolonner som skal skrives (liste eller kommaseparert). Gyldige: {', '.join(KOLONNER)}")
     args = parser.parse_args()
 
     # Parse alle intervaller/lister
@@ -215,6 +218,14 @@ def main():
     for m in (args.måned or []):
         måneder.extend(parse_intervall_eller_liste(m))
 
+    kolonner = []
+    for k in (args.kolonner or []):
+        kolonner.extend(x for x in k.replace(",", " ").split())
+    ukjente = [k for k in kolonner if k not in KOLONNER]
+    if ukjente:
+        parser.error(f"Ukjente kolonner: {', '.join(ukjente)}")
+    kolonner = tuple(kolonner) or KOLONNER
+
     # Output-filnavn
     parts = []
     if fylker: parts.append(f"fylke-{'-'.join(fylker)}")
@@ -222,6 +233,7 @@ def main():
     if postnumre: parts.append(f"postnr-{'-'.join(postnumre)}")
     if år: parts.append(f"år-{'-'.join(år)}")
     if måneder: parts.append(f"mnd-{'-'.join(måneder)}")
+    if kolonner != KOLONNER: parts.append(f"kol-{'-'.join(kolonner)}")
 
     base = "eiendomsoverdragelser"
     if parts:
@@ -229,17 +241,24 @@ def main():
     OUTPUT_FILE = os.path.join(OUTPUT_ROOT, f"{base}_flat.csv")
 
     os.makedirs(OUTPUT_ROOT, exist_ok=True)
-    data = list(collect(fylker, kommuner, postnumre, år, måneder))
-    if not data:
+    # Skriv til midlertidig fil, slik at en tom kjøring ikke overskriver en tidligere CSV
+    tmp = OUTPUT_FILE + ".tmp"
+    antall = 0
+    with open(tmp, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(kolonner)
+        for rad in collect(fylker, kommuner, postnumre, år, måneder, kolonner):
+            w.writerow(rad)
+            antall += 1
+
+    if not antall:
+        os.remove(tmp)
         print("Ingen data funnet under matrikkelen/")
         return
 
-    with open(OUTPUT_FILE, "w", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=list(data[0].keys()))
-        w.writeheader()
-        w.writerows(data)
+    os.replace(tmp, OUTPUT_FILE)
 
-    print(f"Skrev {len(data)} rader til {OUTPUT_FILE}")
+    print(f"Skrev {antall} rader til {OUTPUT_FILE}")
 
 
 if __name__ == "__main__":
@@ -14,6 +14,8 @@ import json
 # -------------------------------------------
 DATA_DIR = "matrikkelen"
 DATA_SOURCE = "postnummer.csv"
+# Leses av pc-server.py for å vite når data må lastes på nytt
+MARKØR = os.path.join(DATA_DIR, ".oppdatert")
 API_URL = "https://services.api.no/api/acies/v1/custom/PropcloudLegacyTransaction"
 
 
@@ -91,9 +93,20 @@ def hent_data(url, destinasjon):
             entries = len(data)
 
         print(f"Ferdig: {size_kb} KB, {lines_after} linjer etter prettify, {entries} entries, varighet={varighet}s")
+        return True
 
     else:
         print(f"Feil ved henting ({r.status_code}): {url}")
+        return False
+
+
+# -------------------------------------------
+# MARKER AT MATRIKKELEN/ ER ENDRET
+# -------------------------------------------
+def marker_oppdatert():
+    os.makedirs(DATA_DIR, exist_ok=True)
+    with open(MARKØR, "w", encoding="utf-8") as f:
+        f.write(datetime.now().isoformat())
 
 
 # -------------------------------------------
@@ -246,6 +259,7 @@ def main():
     # -------------------------------------------
     # HENT DATA BASERT PÅ KOMBINASJONENE
     # -------------------------------------------
+    skrevet = False
     for item in kombinasjoner:
         countyCode = item["countyCode"]
         countyName = item["countyName"]
@@ -276,7 +290,11 @@ def main():
                 dest = os.path.join(dest_dir, filename)
 
                 print(f"Henter: {url} -> {dest}")
-                hent_data(url, dest)
+                skrevet = hent_data(url, dest) or skrevet
+
+    # Én markering per kjøring, slik at pc-server.py laster data på nytt én gang
+    if skrevet:
+        marker_oppdatert()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+from urllib.error import HTTPError, URLError
+from urllib.request import urlopen
+
+STANDARD_SPØRRINGER = [
+    "",
+    "format=csv",
+    "år=2023",
+    "måned=1:6",
+    "år=2022:2024&måned=6",
+]
+
+
+def persentil(verdier, p):
+    if not verdier:
+        return 0.0
+    verdier = sorted(verdier)
+    i = min(len(verdier) - 1, int(round(p / 100 * (len(verdier) - 1))))
+    return verdier[i]
+
+
+def kjør(url):
+    """
+    Returnerer (sekunder, byte, feil). feil er None ved 2xx, ellers
+    statuskoden eller en kort beskrivelse.
+    """
+    start = time.perf_counter()
+    try:
+        with urlopen(url) as r:
+            størrelse = len(r.read())
+    except HTTPError as e:
+        return time.perf_counter() - start, 0, e.code
+    except (URLError, OSError) as e:
+        return time.perf_counter() - start, 0, type(e).__name__
+    return time.perf_counter() - start, størrelse, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lasttest av pc-server.py med samtidige klienter")
+    parser.add_argument("--url", default="http://127.0.0.1:8765/transaksjoner", help="Endepunkt å teste")
+    parser.add_argument("--klienter", type=int, default=8, help="Antall samtidige klienter")
+    parser.add_argument("--forespørsler", type=int, default=500, help="Totalt antall forespørsler")
+    parser.add_argument("--spørring", type=str, nargs="*", help="Spørrestrenger som brukes om hverandre (f.eks. 'kommune=5001&år=2023')")
+    args = parser.parse_args()
+
+    spørringer = args.spørring or STANDARD_SPØRRINGER
+    urler = [f"{args.url}?{quote(spørringer[i % len(spørringer)], safe='=&:,')}" for i in range(args.forespørsler)]
+
+    print(f"Sender {len(urler)} forespørsler med {args.klienter} klienter mot {args.url}")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.klienter) as pool:
+        resultater = list(pool.map(kjør, urler))
+    varighet = time.perf_counter() - start
+
+    tider = [t * 1000 for t, _, feil in resultater if feil is None]
+    byte = sum(s for _, s, _ in resultater)
+    feil = {}
+    for _, _, f in resultater:
+        if f is not None:
+            feil[f] = feil.get(f, 0) + 1
+    antall_feil = sum(feil.values())
+
+    print(f"Ferdig: {len(resultater)} forespørsler på {varighet:.2f}s ({len(resultater) / varighet:.0f} req/s), {byte // 1024} KB")
+    detaljer = ", ".join(f"{k}: {n}" for k, n in sorted(feil.items(), key=str))
+    print(f"Feil: {antall_feil} ({100 * antall_feil / len(resultater):.1f} %) {detaljer}".rstrip())
+    if tider:
+        print(f"p50={persentil(tider, 50):.1f}ms p99={persentil(tider, 99):.1f}ms maks={max(tider):.1f}ms (vellykkede)")
+
+
+if __name__ == "__main__":
+    main()
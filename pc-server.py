@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os, csv, io, json, argparse, threading
+import importlib.util
+from collections import OrderedDict
+from glob import iglob
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+INPUT_ROOT = "matrikkelen"
+DATA_SOURCE = "postnummer.csv"
+# pc-get.py oppdaterer denne filen etter en kjøring som har skrevet nye JSON-filer
+MARKØR = os.path.join(INPUT_ROOT, ".oppdatert")
+CACHE_MAKS_BYTE = 256 * 1024 * 1024
+# Større svar strømmes uten å bufres eller caches
+SVAR_MAKS_BYTE = 16 * 1024 * 1024
+BATCH = 1000
+
+# Spørreparametere og ASCII-alias
+PARAMETRE = {
+    "fylke": "fylke",
+    "kommune": "kommune",
+    "postnummer": "postnummer",
+    "år": "år",
+    "aar": "år",
+    "måned": "måned",
+    "maaned": "måned",
+    "format": "format",
+}
+
+# Grenser for tall og intervaller i filtrene
+GRENSER = {
+    "fylke": (0, 99),
+    "kommune": (0, 9999),
+    "postnummer": (0, 9999),
+    "år": (1900, 2100),
+    "måned": (1, 12),
+}
+
+
+def last_etl():
+    sti = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pc-etl.py")
+    spec = importlib.util.spec_from_file_location("pc_etl", sti)
+    modul = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modul)
+    return modul
+
+
+# Samme skjema som pc-etl.py, slik at kolonnene ikke kan gli fra hverandre
+ETL = last_etl()
+FELTER = ETL.KOLONNER
+KILDER = [ETL.KILDEFELT.get(k, k) for k in FELTER]
+
+
+# -----------------------------
+# Hjelpefunksjoner
+# -----------------------------
+def safe_load(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Feil ved lesing av {path}: {e}")
+        return []
+
+
+def parse_cadestral_id(cid):
+    parts = (cid or "").split("-")
+    parts += ["0"] * (5 - len(parts))
+    return parts[0], parts[1], parts[2], parts[3], parts[4]
+
+
+def les_postnummerdata():
+    data = []
+    with open(DATA_SOURCE, newline="", encoding="utf-8") as csvfile:
+        reader = csv.DictReader(csvfile)
+        for row in reader:
+            data.append(row)
+    return data
+
+
+def bygg_indekser(postdata):
+    """
+    Slår opp navn og nummer (små bokstaver) til fylkes- og kommunenummer.
+    """
+    fylker, kommuner = {}, {}
+    for rad in postdata:
+        fylker[rad["Fylkesnummer"]] = rad["Fylkesnummer"]
+        fylker[rad["Fylkesnavn"].lower()] = rad["Fylkesnummer"]
+        kommuner[rad["Kommunenummer"]] = rad["Kommunenummer"]
+        kommuner[rad["Kommunenavn"].lower()] = rad["Kommunenummer"]
+    return fylker, kommuner
+
+
+def markør_mtime():
+    try:
+        return os.path.getmtime(MARKØR)
+    except OSError:
+        return None
+
+
+# -----------------------------
+# Transaksjonslager i minnet
+# -----------------------------
+def transaksjonsnøkkel(t):
+    """
+    Samme nøkkel som i pc-agg.py: documentNumber starter på nytt hvert år,
+    så året tas med. Uten documentNumber gis None, og raden dedupliseres ikke.
+    """
+    dok = t.get("documentNumber")
+    if dok is None or dok == "":
+        return None
+    return f"{(t.get('date') or '')[:4]}-{dok}"
+
+
+def last_transaksjoner():
+    """
+    Leser alle JSON-filer én gang. Hver rad lagres som (fylke, kommune,
+    postnummer, år, måned, rad), der rad er en tuple i FELTER-rekkefølge og
+    år/måned er tall, slik at filtrering ikke trenger å tolke feltene på nytt.
+    """
+    seen = set()
+    rader = []
+    for f in iglob(os.path.join(INPUT_ROOT, "**", "*-*.json"), recursive=True):
+        for t in safe_load(f):
+            if not isinstance(t, dict):
+                continue
+
+            key = transaksjonsnøkkel(t)
+            if key is not None:
+                if key in seen:
+                    continue
+                seen.add(key)
+
+            raw_pc = str(t.get("postalCode") or "").strip()
+            pc = raw_pc.zfill(4)
+            kommune = str(t.get("municipalityCode") or "")
+            fylke = str(t.get("countyCode") or "") or kommune[:2]
+            dato = t.get("date") or ""
+            y, m = dato[:4], dato[5:7]
+
+            # Avledede felt legges inn under kolonnenavnet, som i pc-etl.py
+            t["år"] = y
+            t["postalCode"] = pc
+            _, t["gnr"], t["bnr"], t["fnr"], t["snr"] = parse_cadestral_id(t.get("cadestralId"))
+            t["source"] = f
+            rader.append((
+                fylke, kommune, pc,
+                int(y) if y.isdigit() else None,
+                int(m) if m.isdigit() else None,
+                tuple(map(t.get, KILDER)),
+            ))
+    return rader
+
+
+class Lager:
+    def __init__(self):
+        self.fylker, self.kommuner = bygg_indekser(les_postnummerdata())
+        self.lås = threading.Lock()
+        self.lastelås = threading.Lock()
+        self.cache = OrderedDict()
+        self.cache_byte = 0
+        self.treff = 0
+        self.bom = 0
+        self.generasjon = -1
+        self.rader = []
+        self.sjekk()
+
+    def sjekk(self):
+        """
+        Laster transaksjonene på nytt og tømmer cachen hvis pc-get.py har
+        skrevet nye filer siden forrige last. Bare én tråd laster om gangen;
+        de andre svarer fra de gamle dataene til de nye er klare.
+        """
+        mtime = markør_mtime()
+        if mtime == self.generasjon:
+            return
+        if not self.lastelås.acquire(blocking=False):
+            return
+        try:
+            if mtime == self.generasjon:
+                return
+            print("Laster transaksjoner fra matrikkelen/")
+            rader = last_transaksjoner()
+            with self.lås:
+                self.rader = rader
+                self.cache.clear()
+                self.cache_byte = 0
+                self.generasjon = mtime
+            print(f"Lastet {len(rader)} transaksjoner")
+        finally:
+            self.lastelås.release()
+
+    def øyeblikk(self):
+        with self.lås:
+            return self.rader, self.generasjon
+
+    def hent_cache(self, nøkkel):
+        with self.lås:
+            verdi = self.cache.get(nøkkel)
+            if verdi is None:
+                self.bom += 1
+                return None
+            self.cache.move_to_end(nøkkel)
+            self.treff += 1
+            return verdi
+
+    def lagre_cache(self, nøkkel, generasjon, verdi):
+        if len(verdi) > SVAR_MAKS_BYTE:
+            return
+        with self.lås:
+            if generasjon != self.generasjon or nøkkel in self.cache:
+                return
+            self.cache[nøkkel] = verdi
+            self.cache_byte += len(verdi)
+            while self.cache_byte > CACHE_MAKS_BYTE:
+                _, gammel = self.cache.popitem(last=False)
+                self.cache_byte -= len(gammel)
+
+
+def filtrer(rader, fylker, kommuner, postnumre, år, måneder):
+    for fylke, kommune, pc, y, m, rad in rader:
+        if fylker and fylke not in fylker:
+            continue
+        if kommuner and kommune not in kommuner:
+            continue
+        if postnumre and pc not in postnumre:
+            continue
+        if år and (y is None or not any(a <= y <= b for a, b in år)):
+            continue
+        if måneder and (m is None or not any(a <= m <= b for a, b in måneder)):
+            continue
+        yield rad
+
+
+# -----------------------------
+# HTTP
+# -----------------------------
+def les_intervall(navn, verdi):
+    """
+    Tolker '2022' eller '2022:2024' som (start, slutt) innenfor GRENSER.
+    """
+    lav, høy = GRENSER[navn]
+    start, kolon, slutt = verdi.partition(":")
+    if not start.isdigit() or (kolon and not slutt.isdigit()):
+        raise ValueError(f"ukjent {navn} '{verdi}'")
+    a = int(start)
+    b = int(slutt) if kolon else a
+    if not lav <= a <= b <= høy:
+        raise ValueError(f"{navn} '{verdi}' må ligge innenfor {lav}-{høy}")
+    return a, b
+
+
+def les_filtre(lager, qs):
+    """
+    Verdier skilles med komma. Hver verdi slås først opp som navn eller
+    nummer i postnummer.csv, ellers må den være et tall eller intervall.
+    År og måned beholdes som intervaller; koder foldes ut til mengder.
+    """
+    def intervaller(navn, indeks=None):
+        ut = []
+        for v in qs.get(navn, []):
+            for del_ in v.split(","):
+                del_ = del_.strip()
+                if not del_:
+                    continue
+                if indeks is not None and del_.lower() in indeks:
+                    kode = int(indeks[del_.lower()])
+                    ut.append((kode, kode))
+                else:
+                    ut.append(les_intervall(navn, del_))
+        return ut
+
+    def koder(navn, bredde, indeks=None):
+        return {str(i).zfill(bredde) for a, b in intervaller(navn, indeks) for i in range(a, b + 1)}
+
+    fylker = koder("fylke", 2, lager.fylker)
+    kommuner = koder("kommune", 4, lager.kommuner)
+    postnumre = koder("postnummer", 4)
+    år = sorted(set(intervaller("år")))
+    måneder = sorted(set(intervaller("måned")))
+    return fylker, kommuner, postnumre, år, måneder
+
+
+def formater(rader, format):
+    """
+    Gir output i biter på BATCH rader, slik at store svar kan strømmes.
+    """
+    if format == "csv":
+        buf = io.StringIO()
+        w = csv.writer(buf)
+        w.writerow(FELTER)
+        for i, rad in enumerate(rader, 1):
+            w.writerow(rad)
+            if i % BATCH == 0:
+                yield buf.getvalue().encode("utf-8")
+                buf.seek(0)
+                buf.truncate()
+        yield buf.getvalue().encode("utf-8")
+    else:
+        linjer = []
+        for rad in rader:
+            linjer.append(json.dumps(dict(zip(FELTER, rad)), ensure_ascii=False))
+            if len(linjer) == BATCH:
+                yield ("\n".join(linjer) + "\n").encode("utf-8")
+                linjer = []
+        if linjer:
+            yield ("\n".join(linjer) + "\n").encode("utf-8")
+
+
+class Server(ThreadingHTTPServer):
+    # Standardkøen på 5 gir tilkoblingsfeil og ~1s forsinkelse ved mange samtidige klienter
+    request_queue_size = 128
+
+
+class Handler(BaseHTTPRequestHandler):
+    lager = None
+
+    def do_GET(self):
+        # BaseHTTPRequestHandler dekoder forespørselslinjen som latin-1.
+        # Feilmeldinger går i explain (HTML-kroppen), siden statuslinjen
+        # også må være latin-1 og ikke kan inneholde brukerens verdier.
+        try:
+            url = urlparse(self.path.encode("latin-1").decode("utf-8"))
+        except UnicodeError:
+            self.send_error(400, explain="Forespørselen er ikke gyldig UTF-8")
+            return
+        if url.path == "/status":
+            return self.status()
+        if url.path != "/transaksjoner":
+            self.send_error(404, explain="Bruk /transaksjoner eller /status")
+            return
+
+        lager = self.lager
+        lager.sjekk()
+        qs = {}
+        for navn, verdi in parse_qs(url.query).items():
+            if navn not in PARAMETRE:
+                self.send_error(400, explain=f"Ukjent parameter '{navn}'")
+                return
+            qs.setdefault(PARAMETRE[navn], []).extend(verdi)
+        format = (qs.get("format") or ["ndjson"])[0]
+        if format not in ("ndjson", "csv"):
+            self.send_error(400, explain="format må være ndjson eller csv")
+            return
+        try:
+            filtre = les_filtre(lager, qs)
+        except ValueError as e:
+            self.send_error(400, explain=f"Ugyldig filter: {e}")
+            return
+
+        content_type = "text/csv" if format == "csv" else "application/x-ndjson"
+        nøkkel = (format, *(tuple(sorted(f)) for f in filtre))
+        treff = lager.hent_cache(nøkkel)
+        if treff is not None:
+            self.send_response(200)
+            self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+            self.send_header("Content-Length", str(len(treff)))
+            self.send_header("X-Cache", "HIT")
+            self.end_headers()
+            self.wfile.write(treff)
+            return
+
+        rader, generasjon = lager.øyeblikk()
+        self.send_response(200)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        self.send_header("X-Cache", "MISS")
+        self.end_headers()
+        biter, størrelse = [], 0
+        for bit in formater(filtrer(rader, *filtre), format):
+            self.wfile.write(bit)
+            if biter is not None:
+                størrelse += len(bit)
+                biter.append(bit)
+                if størrelse > SVAR_MAKS_BYTE:
+                    biter = None
+        if biter is not None:
+            lager.lagre_cache(nøkkel, generasjon, b"".join(biter))
+
+    def status(self):
+        lager = self.lager
+        body = json.dumps({
+            "transaksjoner": len(lager.rader),
+            "cache": len(lager.cache),
+            "cache_byte": lager.cache_byte,
+            "treff": lager.treff,
+            "bom": lager.bom,
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# -----------------------------
+# Hovedfunksjon
+# -----------------------------
+def main():
+    parser = argparse.ArgumentParser(description="HTTP/JSON-server for eiendomsoverdragelser i matrikkelen/.")
+    parser.add_argument("--vert", default="127.0.0.1", help="Adresse å lytte på")
+    parser.add_argument("--port", type=int, default=8765, help="Port å lytte på")
+    args = parser.parse_args()
+
+    Handler.lager = Lager()
+    server = Server((args.vert, args.port), Handler)
+    print(f"Lytter på http://{args.vert}:{args.port}/transaksjoner")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Avslutter.")
+
+
+if __name__ == "__main__":
+    main()